@@ -0,0 +1,20 @@
+import functools
+import os
+
+import orjson
+
+CONFIG_FILE = 'config.json'
+
+@functools.lru_cache(maxsize=1)
+def _read_config(path, mtime_ns):
+    # mtime_ns is part of the cache key so an edited config.json is re-read
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def load_config(*keys):
+    try:
+        config = _read_config(CONFIG_FILE, os.stat(CONFIG_FILE).st_mtime_ns)
+        return tuple(config.get(key) for key in keys)
+    except Exception as e:
+        print(f"Error loading config.json: {e}")
+        return (None,) * len(keys)
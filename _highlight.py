@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Effort is reported in minutes; 1 person-day = 480 minutes
+MINUTES_PER_DAY = 480
+
+def make_session(pool_size=10):
+    # Shared HTTP session so repeated API calls reuse pooled TCP/TLS connections
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    ))
+    return session
+
+def person_days(effort_minutes):
+    """Convert effort minutes to person-days rounded to 2 decimals; missing effort counts as 0.
+
+    Each value is divided by MINUTES_PER_DAY and rounded with Python's round(), which gives
+    exactly round(effort / 480, 2). np.round rounds the scaled value half-to-even, and
+    multiplying by 1/480 is not bit-identical to dividing by 480; both change some figures.
+    """
+    days = effort_minutes.to_numpy(dtype=np.float64, na_value=0.0) / MINUTES_PER_DAY
+    return pd.Series([round(value, 2) for value in days.tolist()], index=effort_minutes.index, dtype='float64')
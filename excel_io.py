@@ -0,0 +1,114 @@
+import functools
+import threading
+import zipfile
+from collections import namedtuple
+
+import xlsxwriter
+import xlsxwriter.workbook
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_string_dtype
+from xlsxwriter.utility import xl_col_to_name
+
+# zlib level used when packaging workbooks: 1 roughly halves the save time of large
+# reports for a ~15% larger file than the default level 6
+ZIP_COMPRESSLEVEL = 1
+
+# Up to this many rows a plain Python scan measures column widths faster than pandas,
+# whose fixed per-call overhead dominates on small sheets
+SMALL_SHEET_ROWS = 256
+
+# Tech Debt = Effort (D) x Cost (E) for every data row; {last} is the last data row
+TECH_DEBT_FORMULA = '=ROUND(D2:D{last}*E2:E{last}, 2)'
+
+# One worksheet of a report: the data rows, the TOTAL row written after them, the
+# column letters formatted as 0.00 and an optional column computed by a formula
+SheetSpec = namedtuple(
+    'SheetSpec',
+    ['name', 'df', 'total_row', 'numeric_cols', 'formula_col', 'formula'],
+    defaults=((), None, None)
+)
+
+@functools.lru_cache(maxsize=None)
+def column_letter(idx):
+    return xl_col_to_name(idx)
+
+def _data_length(values):
+    # Both paths skip empty cells, so a column's width does not depend on the row count
+    if len(values) <= SMALL_SHEET_ROWS:
+        return max((len(str(value)) for value in values.tolist() if pd.notna(value)), default=0)
+    # String lengths are measured in pandas rather than cell by cell
+    lengths = values.dropna().astype(str).str.len()
+    return int(lengths.max()) if len(lengths) else 0
+
+# Serializes the module-global ZipFile swap in close_workbook across threads
+_ZIPFILE_LOCK = threading.Lock()
+
+def close_workbook(wb, compresslevel=ZIP_COMPRESSLEVEL):
+    # XlsxWriter has no compression option, so its ZipFile is swapped for the duration of close().
+    # This only affects file-backed workbooks: in_memory ones are packaged with
+    # ZipFile.writestr(ZipInfo), which ignores compresslevel
+    with _ZIPFILE_LOCK:
+        original_zipfile = xlsxwriter.workbook.ZipFile
+        xlsxwriter.workbook.ZipFile = functools.partial(zipfile.ZipFile, compresslevel=compresslevel)
+        try:
+            wb.close()
+        finally:
+            xlsxwriter.workbook.ZipFile = original_zipfile
+
+def _column_writer(ws, values):
+    if is_numeric_dtype(values):
+        return ws.write_number
+    if is_string_dtype(values) and all(isinstance(value, str) for value in values.tolist()):
+        return ws.write_string
+    # Mixed object columns (e.g. int and str application ids) fall back to per-cell dispatch
+    return ws.write
+
+def _write_sheet(wb, spec, formats):
+    ws = wb.add_worksheet(spec.name)
+    df = spec.df
+    # Column letters are resolved to indexes once per sheet; the loops below only test integers
+    letters = [column_letter(idx) for idx in range(len(df.columns))]
+    numeric_idx = frozenset(idx for idx, letter in enumerate(letters) if letter in spec.numeric_cols)
+    formula_idx = letters.index(spec.formula_col) if spec.formula_col else None
+    last_row = len(df)
+
+    # Width and number format are set once per column instead of per cell
+    for idx, column in enumerate(df.columns):
+        max_length = max(len(column), len(str(spec.total_row[idx])), _data_length(df[column]))
+        col_format = formats['number'] if idx in numeric_idx else None
+        ws.set_column(idx, idx, max_length + 2, col_format)
+
+    ws.write_row(0, 0, df.columns, formats['bold'])
+
+    # One dynamic array formula covers every data row (a legacy array formula in older Excel)
+    if formula_idx is not None and last_row:
+        ws.write_dynamic_array_formula(1, formula_idx, last_row, formula_idx, spec.formula.format(last=last_row + 1))
+
+    # Writers are picked once per column, skipping XlsxWriter's per-cell type sniffing
+    # (and URL/formula detection on strings); all-empty placeholder columns are not written
+    columns = [idx for idx, column in enumerate(df.columns) if df[column].notna().any()]
+    writers = [_column_writer(ws, df.iloc[:, idx]) for idx in columns]
+    for row, values in enumerate(df.iloc[:, columns].itertuples(index=False, name=None), start=1):
+        for col, write, value in zip(columns, writers, values):
+            write(row, col, value)
+
+    # TOTAL row: bold, numeric columns keep 0.00 and the formula column sums the data rows
+    total_row_num = last_row + 1
+    for idx, value in enumerate(spec.total_row):
+        cell_format = formats['bold_number'] if idx in numeric_idx else formats['bold']
+        if idx == formula_idx and last_row:
+            ws.write_formula(total_row_num, idx, f'=SUM({letters[idx]}2:{letters[idx]}{total_row_num})', cell_format)
+        else:
+            ws.write(total_row_num, idx, value, cell_format)
+
+def write_report(sheets, path):
+    # Stream all sheets with XlsxWriter; constant_memory flushes each row to disk as it is written
+    wb = xlsxwriter.Workbook(path, {'constant_memory': True})
+    formats = {
+        'bold': wb.add_format({'bold': True}),
+        'number': wb.add_format({'num_format': '0.00'}),
+        'bold_number': wb.add_format({'bold': True, 'num_format': '0.00'})
+    }
+    for spec in sheets:
+        _write_sheet(wb, spec, formats)
+    close_workbook(wb)